@@ -3,8 +3,9 @@ Simple health check module for Render deployment
 This will allow the application to start up faster for debugging
 """
 
-from flask import Blueprint, jsonify, render_template
+from flask import Blueprint, Response, jsonify
 import os
+import json
 import sys
 import platform
 import logging
@@ -12,33 +13,64 @@ import logging
 # Create blueprint
 health_bp = Blueprint('health', __name__)
 
+# Liveness probe paths answered before the request reaches Flask
+PROBE_PATHS = frozenset({'/healthz', '/readyz'})
+_PROBE_BODY = b'{"status":"ok"}'
+_PROBE_HEADERS = [('Content-Type', 'application/json'), ('Content-Length', str(len(_PROBE_BODY)))]
+
+
+class HealthCheckMiddleware:
+    """WSGI middleware that answers platform liveness probes without routing through Flask."""
+    
+    def __init__(self, wsgi_app):
+        self.wsgi_app = wsgi_app
+    
+    def __call__(self, environ, start_response):
+        if environ.get('PATH_INFO') in PROBE_PATHS and environ.get('REQUEST_METHOD') in ('GET', 'HEAD'):
+            start_response('200 OK', list(_PROBE_HEADERS))
+            return [] if environ['REQUEST_METHOD'] == 'HEAD' else [_PROBE_BODY]
+        return self.wsgi_app(environ, start_response)
+
+
+def _build_health_data():
+    """Build the /health payload; none of it changes while the process runs."""
+    # System information (helpful for debugging)
+    system_info = {
+        "python_version": platform.python_version(),
+        "system": platform.system(),
+        "machine": platform.machine(),
+        "flask_env": os.getenv("FLASK_ENV", "production"),
+        "port": os.getenv("PORT", "10000"),
+    }
+    
+    # Don't include sensitive environment variables
+    env_subset = {}
+    for key in ["FLASK_APP", "FLASK_ENV", "PORT", "RENDER_SERVICE_ID"]:
+        if key in os.environ:
+            env_subset[key] = os.environ[key]
+    
+    return {
+        "status": "ok",
+        "message": "API server is running",
+        "system": system_info,
+        "env": env_subset,
+    }
+
+# Computed once at import instead of on every probe
+_HEALTH_DATA = _build_health_data()
+
+# The root endpoint's body never changes, so serialize it once (same bytes jsonify produced)
+_INDEX_BODY = json.dumps({
+    "status": "ok",
+    "message": "Censorly API is running",
+    "docs": "/api/docs"
+}, separators=(',', ':'), sort_keys=True) + "\n"
+
 @health_bp.route('/health', methods=['GET'])
 def health_check():
     """Basic health check endpoint that doesn't require database connection"""
     try:
-        # System information (helpful for debugging)
-        system_info = {
-            "python_version": platform.python_version(),
-            "system": platform.system(),
-            "machine": platform.machine(),
-            "flask_env": os.getenv("FLASK_ENV", "production"),
-            "port": os.getenv("PORT", "10000"),
-        }
-        
-        # Don't include sensitive environment variables
-        env_subset = {}
-        for key in ["FLASK_APP", "FLASK_ENV", "PORT", "RENDER_SERVICE_ID"]:
-            if key in os.environ:
-                env_subset[key] = os.environ[key]
-        
-        health_data = {
-            "status": "ok",
-            "message": "API server is running",
-            "system": system_info,
-            "env": env_subset,
-        }
-        
-        return jsonify(health_data)
+        return jsonify(_HEALTH_DATA)
     except Exception as e:
         logging.error(f"Health check error: {str(e)}")
         return jsonify({
@@ -49,11 +81,4 @@ def health_check():
 @health_bp.route('/', methods=['GET'])
 def index():
     """Root endpoint to confirm server is running"""
-    try:
-        return render_template('health.html')
-    except:
-        return jsonify({
-            "status": "ok",
-            "message": "Censorly API is running",
-            "docs": "/api/docs"
-        })
+    return Response(_INDEX_BODY, mimetype='application/json')
@@ -226,9 +226,9 @@ def upgrade_user_subscription(user_id, tier, duration_days, payment_id, amount):
             'updated_at': start_date.isoformat()
         }
         
-        result = supabase_service.client.table('users').update(user_update).eq('id', user_id).execute()
+        result = supabase_service.update_user(user_id, user_update)
         
-        if not result.data:
+        if not result.get('user'):
             return {'success': False, 'error': 'Failed to update user tier'}
         
         # Create subscription record
@@ -237,6 +237,7 @@ def upgrade_user_subscription(user_id, tier, duration_days, payment_id, amount):
             'user_id': user_id,
             'tier': tier,
             'status': 'active',
+            'is_active': True,
             'payment_id': payment_id,
             'amount': amount,
             'currency': 'INR',
@@ -246,13 +247,17 @@ def upgrade_user_subscription(user_id, tier, duration_days, payment_id, amount):
             'updated_at': start_date.isoformat()
         }
         
-        sub_result = supabase_service.client.table('subscriptions').insert(subscription_data).execute()
+        # Goes through the service so the cached subscription lookup is invalidated
+        sub_result = supabase_service.insert_subscription(subscription_data)
+        
+        if not sub_result['success']:
+            return {'success': False, 'error': sub_result['error']}
         
         logger.info(f"User {user_id} upgraded to {tier} tier until {end_date.strftime('%Y-%m-%d')}")
         
         return {
             'success': True,
-            'subscription': sub_result.data[0] if sub_result.data else None
+            'subscription': sub_result['subscription']
         }
         
     except Exception as e:
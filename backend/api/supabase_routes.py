@@ -14,7 +14,6 @@ import os
 import shutil
 import io
 from pathlib import Path
-from collections import defaultdict
 from werkzeug.utils import secure_filename
 
 from services.supabase_service import supabase_service
@@ -23,16 +22,12 @@ from utils.security_utils import secure_compare, verify_api_key
 # Import security decorators
 from decorators import secure_api_key_required
 
-# Import rate limiter
+# Import rate limiter (shared with the API key security decorator)
 try:
-    from services.rate_limiter import RateLimiter
-    rate_limiter = RateLimiter()
+    from services.rate_limiter import rate_limiter
 except ImportError:
     rate_limiter = None
 
-# Simple in-memory rate limiting storage
-_rate_limit_storage = defaultdict(list)
-
 logger = logging.getLogger(__name__)
 
 # Create blueprint
@@ -134,7 +129,7 @@ def api_key_required(f):
             logger.warning("Oversized API key detected - possible attack")
             return jsonify({'error': 'Invalid API key format'}), 401
             
-        # Verify API key with our enhanced secure verification
+        # Verify API key with our enhanced secure verification (also records usage)
         key_data = supabase_service.verify_api_key(api_key)
         if not key_data:
             logger.warning("Invalid API key attempt")
@@ -148,9 +143,6 @@ def api_key_required(f):
         if not user_data:
             return jsonify({'error': 'User not found'}), 404
         
-        # Increment API key usage count for actual operations
-        supabase_service.increment_api_key_usage(key_data['id'])
-        
         # Store user and key data in g for consistency with auth decorator
         g.current_user = user_data
         g.current_api_key = key_data
@@ -184,12 +176,8 @@ def register():
         if len(password) < 8:
             return jsonify({'error': 'Password must be at least 8 characters'}), 400
         
-        # Check if user already exists
-        existing_user = supabase_service.get_user_by_email(email)
-        if existing_user:
-            return jsonify({'error': 'User already exists'}), 409
-        
-        # Create user
+        # Create user; the insert itself rejects duplicate emails, so a
+        # separate existence check would only add a round trip and a race
         result = supabase_service.create_user(email, password, full_name)
         
         if result['success']:
@@ -251,6 +239,8 @@ def register():
                         'subscription_tier': result['user']['subscription_tier']
                     }
                 }), 201
+        elif result['error'] == 'User already exists':
+            return jsonify({'error': 'User already exists'}), 409
         else:
             return jsonify({'error': result['error']}), 400
             
@@ -571,12 +561,12 @@ def upload_profile_image():
                 # Continue anyway, old file cleanup is not critical
             
             # Update user profile with image URL
-            update_result = supabase_service.client.table("users").update({
+            update_result = supabase_service.update_user(user['id'], {
                 "profile_image_url": image_url,
                 "updated_at": datetime.utcnow().isoformat()
-            }).eq("id", user['id']).execute()
+            })
             
-            if update_result.data:
+            if update_result.get('user'):
                 logger.info(f"Profile image updated for user {user['id']}: {unique_filename}")
                 return jsonify({
                     'message': 'Profile image updated successfully',
@@ -627,12 +617,12 @@ def delete_profile_image():
                 # Continue anyway, we'll still clear the URL from database
         
         # Update user profile to remove image URL
-        update_result = supabase_service.client.table("users").update({
+        update_result = supabase_service.update_user(user['id'], {
             "profile_image_url": None,
             "updated_at": datetime.utcnow().isoformat()
-        }).eq("id", user['id']).execute()
+        })
         
-        if update_result.data:
+        if update_result.get('user'):
             logger.info(f"Profile image deleted for user {user['id']}")
             return jsonify({
                 'message': 'Profile image deleted successfully'
@@ -744,6 +734,10 @@ def get_usage_stats():
                 }
             },
             'limits': limits,
+            'rate_limits': {
+                endpoint_type: rate_limiter.get_usage_stats(user_id, endpoint_type, subscription_tier)
+                for endpoint_type in ('general', 'processing', 'upload')
+            } if rate_limiter else None,
             'tier': subscription_tier,
             'reset_date': next_reset.isoformat(),
             'days_remaining': days_remaining,
@@ -40,7 +40,7 @@ validate_environment()
 # Import services and routes
 from services.supabase_service import supabase_service
 from api.supabase_routes import supabase_bp
-from api.health import health_bp
+from api.health import health_bp, HealthCheckMiddleware
 from api.payment_routes import payment_bp
 
 def create_app():
@@ -80,19 +80,14 @@ def create_app():
         response.headers.add('Access-Control-Allow-Credentials', 'true')
         return response
     
+    # Answer liveness probes before Flask routing, CORS and JWT handling
+    app.wsgi_app = HealthCheckMiddleware(app.wsgi_app)
+    
     # Register blueprints
     app.register_blueprint(health_bp)
     app.register_blueprint(supabase_bp)
     app.register_blueprint(payment_bp)
     
-    @app.route('/')
-    def home():
-        return {
-            'status': 'success',
-            'message': 'Censorly API is running',
-            'version': '1.0.0'
-        }
-    
     return app
 
 # Create the app instance
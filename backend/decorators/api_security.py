@@ -154,18 +154,21 @@ def _check_rate_limits(key_data: Dict[str, Any], user_data: Dict[str, Any], requ
         # This prevents users from bypassing rate limits by creating multiple API keys
         user_id = user_data['id']
         
-        if hasattr(rate_limiter, 'check_rate') and not rate_limiter.check_rate(
+        allowed, retry_after = rate_limiter.check_rate_limit(
             user_id=user_id,
             endpoint_type=endpoint_type,
             tier=subscription_tier
-        ):
+        )
+        if not allowed:
             logger.warning(f"API request [{request_id}] - rate limit exceeded for user {user_id}")
-            return _error_response(
+            response, status_code = _error_response(
                 "Rate limit exceeded", 
                 429,
                 message="You have exceeded your rate limit. Please try again later or upgrade your plan.",
                 request_id=request_id
             )
+            response.headers['Retry-After'] = str(retry_after)
+            return response, status_code
         
         return None
     
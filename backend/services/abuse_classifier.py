@@ -4,9 +4,12 @@ Supports HuggingFace transformers and scikit-learn models with graceful fallback
 """
 
 import os
+import copy
 import pickle
 import logging
-from typing import Optional, Dict, Any, Union, List
+import threading
+import importlib.util
+from typing import Optional, Dict, Any, Union, List, Tuple
 
 logger = logging.getLogger(__name__)
 
@@ -17,11 +20,10 @@ try:
 except ImportError:
     HAS_NUMPY = False
 
-try:
-    from transformers import AutoTokenizer, AutoModelForSequenceClassification, pipeline
-    HAS_TRANSFORMERS = True
-except ImportError:
-    HAS_TRANSFORMERS = False
+# torch and transformers take seconds to import; only check they exist until a model needs them
+HAS_TORCH = importlib.util.find_spec("torch") is not None
+HAS_TRANSFORMERS = importlib.util.find_spec("transformers") is not None
+HAS_ACCELERATE = importlib.util.find_spec("accelerate") is not None
 
 # Global classifier instance
 _global_classifier = None
@@ -32,16 +34,23 @@ class AbuseClassifier:
     Unified abuse classifier supporting multiple model types.
     """
     
-    def __init__(self, model_path: Optional[str] = None, model_type: str = "auto"):
+    def __init__(self, model_path: Optional[str] = None, model_type: str = "auto", quantize: bool = True,
+                 batch_size: int = 16):
         """
         Initialize the abuse classifier.
         
         Args:
             model_path: Path to the model file or HuggingFace model name
             model_type: Type of model ("huggingface", "sklearn", or "auto")
+            quantize: Whether to run HuggingFace Linear layers as int8 when on CPU
+            batch_size: Texts per forward pass in predict_batch for HuggingFace models
         """
         self.model_path = model_path
         self.model_type = model_type
+        self.quantize = quantize
+        self.batch_size = batch_size
+        self.abuse_label_index = None
+        self._local = threading.local()
         self.model = None
         self.tokenizer = None
         self.vectorizer = None
@@ -100,6 +109,12 @@ class AbuseClassifier:
         if not self.model_path:
             raise Exception("No model path provided for HuggingFace model")
         
+        from transformers import AutoTokenizer, pipeline
+        
+        device, dtype = self._select_device()
+        # Load weights straight into their final tensors instead of building a random-init copy first
+        model_kwargs = {'low_cpu_mem_usage': True} if HAS_ACCELERATE else {}
+        
         try:
             if os.path.isdir(self.model_path):
                 # Local model directory
@@ -108,6 +123,9 @@ class AbuseClassifier:
                     "text-classification",
                     model=self.model_path,
                     tokenizer=self.tokenizer,
+                    device=device,
+                    torch_dtype=dtype,
+                    model_kwargs=model_kwargs,
                     return_all_scores=True
                 )
             else:
@@ -115,10 +133,79 @@ class AbuseClassifier:
                 self.model = pipeline(
                     "text-classification",
                     model=self.model_path,
+                    device=device,
+                    torch_dtype=dtype,
+                    model_kwargs=model_kwargs,
                     return_all_scores=True
                 )
+            self.metadata['device'] = device
+            self.metadata['dtype'] = str(self.model.model.dtype)
+            self.abuse_label_index = self._find_abuse_label_index(self.model.model.config.id2label)
         except Exception as e:
             raise Exception(f"Failed to load HuggingFace model: {e}")
+        
+        if self.quantize:
+            self._quantize_huggingface_model()
+        
+        # The loading thread can use the pipeline it just built
+        self._local.pipeline = self.model
+    
+    def _get_pipeline(self):
+        """
+        Get this thread's HuggingFace pipeline.
+        
+        Pipelines and fast tokenizers keep per-call state and are not safe to share between
+        threads, so each thread gets its own pipeline and tokenizer copy over the shared model weights.
+        """
+        thread_pipeline = getattr(self._local, 'pipeline', None)
+        if thread_pipeline is None or thread_pipeline.model is not self.model.model:
+            from transformers import pipeline
+            
+            thread_pipeline = pipeline(
+                "text-classification",
+                model=self.model.model,
+                tokenizer=copy.deepcopy(self.model.tokenizer),
+                device=self.model.device,
+                return_all_scores=True
+            )
+            self._local.pipeline = thread_pipeline
+        return thread_pipeline
+    
+    @staticmethod
+    def _find_abuse_label_index(id2label: Dict[int, str]) -> Optional[int]:
+        """Find the id of the abuse/toxic label, or None if the model has no such label."""
+        for index, label in sorted(id2label.items()):
+            label = label.lower()
+            if 'toxic' in label or 'abuse' in label or 'negative' in label or label == 'label_1':
+                return index
+        return None
+    
+    def _select_device(self) -> Tuple[str, Any]:
+        """Pick the device and weight dtype for HuggingFace inference (half precision on CUDA/MPS)."""
+        if not HAS_TORCH:
+            return 'cpu', None
+        
+        import torch
+        if torch.cuda.is_available():
+            return 'cuda', torch.bfloat16 if torch.cuda.is_bf16_supported() else torch.float16
+        if getattr(torch.backends, 'mps', None) is not None and torch.backends.mps.is_available():
+            return 'mps', torch.float16
+        return 'cpu', None
+    
+    def _quantize_huggingface_model(self) -> None:
+        """Swap the pipeline's Linear layers for dynamic int8 ones when running on CPU."""
+        if not HAS_TORCH or self.model.device.type != 'cpu':
+            return
+        
+        import torch
+        try:
+            self.model.model = torch.quantization.quantize_dynamic(
+                self.model.model, {torch.nn.Linear}, dtype=torch.qint8
+            )
+            self.metadata['quantization'] = 'dynamic-int8'
+        except Exception as e:
+            # Quantization is an optimisation only; keep the FP32 model
+            logger.warning(f"Dynamic quantization failed, using FP32 model: {e}")
     
     def _load_sklearn_model(self) -> None:
         """Load scikit-learn model."""
@@ -193,31 +280,79 @@ class AbuseClassifier:
             raise Exception("HuggingFace model not loaded")
         
         try:
-            result = self.model(text)
-            
-            # Find abuse/toxic label
-            toxic_score = 0.0
-            for item in result[0]:
-                label = item['label'].lower()
-                if 'toxic' in label or 'abuse' in label or 'negative' in label or label == 'LABEL_1':
-                    toxic_score = item['score']
-                    break
-            
-            is_abusive = toxic_score > 0.5
-            
-            if not return_score:
-                return is_abusive
-            
-            return {
-                'is_abusive': is_abusive,
-                'confidence': float(toxic_score),
-                'model_type': 'huggingface',
-                'raw_output': result[0]
-            }
-            
+            result = self._get_pipeline()(text)
+            return self._format_huggingface_result(result[0], return_score)
         except Exception as e:
             raise Exception(f"HuggingFace prediction failed: {e}")
     
+    def _predict_batch_huggingface(self, texts: List[str], return_scores: bool = False) -> List[Union[bool, Dict[str, Any]]]:
+        """Predict using HuggingFace model, running texts of similar length together."""
+        return [self._format_huggingface_result(output, return_scores) for output in self._run_huggingface_batches(texts)]
+    
+    def _run_huggingface_batches(self, texts: List[str]) -> List[Optional[List[Dict[str, Any]]]]:
+        """
+        Run the pipeline over texts in length-sorted batches; outputs come back in input order.
+        
+        Each distinct text is scored once and shares its output with its duplicates.
+        Blank texts are not scored and get None.
+        """
+        positions: Dict[str, List[int]] = {}
+        for i, text in enumerate(texts):
+            if text.strip():
+                positions.setdefault(text, []).append(i)
+        unique_texts = list(positions)
+        
+        outputs: List[Optional[List[Dict[str, Any]]]] = [None] * len(texts)
+        if not unique_texts:
+            return outputs
+        
+        # Sorting by token length keeps each batch's padding to a minimum
+        hf_pipeline = self._get_pipeline()
+        lengths = hf_pipeline.tokenizer(unique_texts, truncation=True, return_length=True)['length']
+        order = sorted(range(len(unique_texts)), key=lengths.__getitem__)
+        
+        for start in range(0, len(order), self.batch_size):
+            batch_texts = [unique_texts[i] for i in order[start:start + self.batch_size]]
+            batch_outputs = hf_pipeline(batch_texts, batch_size=len(batch_texts))
+            for text, output in zip(batch_texts, batch_outputs):
+                for i in positions[text]:
+                    outputs[i] = output
+        
+        return outputs
+    
+    def _batch_confidences(self, texts: List[str]) -> List[float]:
+        """Probability of abuse for each text, from a single batched model call."""
+        if self.model_type == "huggingface":
+            if self.abuse_label_index is None:
+                return [0.0] * len(texts)
+            return [output[self.abuse_label_index]['score'] if output else 0.0
+                    for output in self._run_huggingface_batches(texts)]
+        
+        if self.model_type == "sklearn":
+            if hasattr(self.model, 'predict_proba'):
+                probabilities = self.model.predict_proba(texts)
+                return [float(p[1]) if len(p) > 1 else 0.0 for p in probabilities]
+            return [1.0 if prediction else 0.0 for prediction in self.model.predict(texts)]
+        
+        raise Exception(f"Unsupported model type: {self.model_type}")
+    
+    def _format_huggingface_result(self, scores: Optional[List[Dict[str, Any]]], return_score: bool) -> Union[bool, Dict[str, Any]]:
+        """Turn one text's pipeline scores (None for an unscored blank text) into a prediction."""
+        scores = scores or []
+        # With return_all_scores=True the pipeline lists scores in label id order
+        toxic_score = scores[self.abuse_label_index]['score'] if scores and self.abuse_label_index is not None else 0.0
+        is_abusive = toxic_score > 0.5
+        
+        if not return_score:
+            return is_abusive
+        
+        return {
+            'is_abusive': is_abusive,
+            'confidence': float(toxic_score),
+            'model_type': 'huggingface',
+            'raw_output': scores
+        }
+    
     def _predict_sklearn(self, text: str, return_score: bool = False) -> Union[bool, Dict[str, Any]]:
         """Predict using scikit-learn model."""
         if not self.model:
@@ -265,6 +400,13 @@ class AbuseClassifier:
         Returns:
             List of predictions
         """
+        if self.is_loaded and self.model and self.model_type == "huggingface" and texts:
+            try:
+                return self._predict_batch_huggingface(texts, return_scores)
+            except Exception as e:
+                # Fall back to one text at a time so a single bad input only fails itself
+                logger.error(f"Batched HuggingFace prediction failed, predicting individually: {e}")
+        
         results = []
         for text in texts:
             try:
@@ -283,6 +425,40 @@ class AbuseClassifier:
                     results.append(False)
         
         return results
+    
+    def predict_batch_arrays(self, texts: List[str]) -> Dict[str, Any]:
+        """
+        Predict multiple texts, returning one array per field instead of one dict per text.
+        
+        Args:
+            texts: List of texts to classify
+            
+        Returns:
+            Dict with 'is_abusive' (bool array), 'confidence' (float32 array) and 'texts',
+            plus 'error' if the model is unavailable or prediction failed
+        """
+        if not HAS_NUMPY:
+            raise Exception("numpy library not available")
+        
+        error = None
+        if not self.is_loaded or not self.model:
+            error = 'Model not loaded'
+        elif texts:
+            try:
+                confidences = np.asarray(self._batch_confidences(texts), dtype=np.float32)
+                return {'is_abusive': confidences > 0.5, 'confidence': confidences, 'texts': texts}
+            except Exception as e:
+                logger.error(f"Batch array prediction error: {e}")
+                error = str(e)
+        
+        result = {
+            'is_abusive': np.zeros(len(texts), dtype=bool),
+            'confidence': np.zeros(len(texts), dtype=np.float32),
+            'texts': texts
+        }
+        if error:
+            result['error'] = error
+        return result
 
     def get_model_info(self) -> str:
         """Get information about the loaded model."""
@@ -0,0 +1,422 @@
+"""
+API rate limiter for AI Profanity Filter SaaS Platform.
+Approximates a sliding window with two fixed-size buckets per window, so each
+check is constant time and constant memory per key. When REDIS_URL is set and
+the redis client is installed, limits are shared across workers via Redis.
+"""
+
+import os
+import math
+import time
+import logging
+import threading
+from array import array
+from collections import OrderedDict
+from typing import Dict, Any, List, Tuple, Iterator, Callable
+
+try:
+    import redis
+    HAS_REDIS = True
+except ImportError:
+    HAS_REDIS = False
+
+logger = logging.getLogger(__name__)
+
+# Window lengths in seconds
+MINUTE = 60
+HOUR = 3600
+DAY = 86400
+
+# Each counter is a flat array of nine 64-bit ints:
+# (count, prev_count, window_index) for the minute, hour and day windows
+_WINDOWS = (
+    (0, MINUTE, 'requests_per_minute'),
+    (3, HOUR, 'requests_per_hour'),
+    (6, DAY, 'requests_per_day'),
+)
+
+
+_EMPTY_COUNTER = array('q', [0] * 9)
+
+
+def _new_counter() -> array:
+    """Create an empty set of minute/hour/day counters."""
+    return array('q', _EMPTY_COUNTER)
+
+
+def _weighted_count(current: int, previous: int, window: int, elapsed: float) -> float:
+    """
+    Approximate the requests in the trailing window from two fixed buckets.
+
+    The previous bucket is weighted by how much of it still overlaps the
+    trailing window: ``current + prev * (1 - elapsed / window)``.
+    """
+    return current + previous * (window - elapsed) / window
+
+
+def _approximate_count(counter: array, offset: int, window: int, now: int) -> float:
+    """Roll one window of a counter forward to ``now`` and return its weighted count."""
+    window_index = now // window
+    last_index = counter[offset + 2]
+
+    if window_index != last_index:
+        counter[offset + 1] = counter[offset] if window_index - last_index == 1 else 0
+        counter[offset] = 0
+        counter[offset + 2] = window_index
+
+    return _weighted_count(counter[offset], counter[offset + 1], window, now - window_index * window)
+
+
+def _window_counts(counter: array, now: int) -> Iterator[Tuple[int, int, str, float]]:
+    """Lazily yield (offset, window, limit name, weighted count) for each window, minute first."""
+    for offset, window, limit_name in _WINDOWS:
+        yield offset, window, limit_name, _approximate_count(counter, offset, window, now)
+
+
+def _retry_after(current: int, previous: int, limit: int, window: int, elapsed: float) -> int:
+    """Whole seconds until the weighted count of an exhausted window is strictly below its limit."""
+    remaining = window - elapsed
+
+    if current < limit:
+        # Wait for enough of the previous bucket to slide out of the window
+        wait = remaining - (limit - current) * window / previous
+    else:
+        # Wait for the current bucket to roll over and then partly slide out
+        wait = remaining + window - limit * window / current
+
+    # Requests are rejected while the count is >= the limit, so retry on the
+    # first whole second strictly after the count reaches it
+    return max(1, math.floor(wait) + 1)
+
+
+class _Shard:
+    """One independently locked slice of the rate limiter's counters."""
+
+    __slots__ = ('counters', 'cooldown_until', 'lock', 'calls_since_gc')
+
+    def __init__(self):
+        self.counters: "OrderedDict[str, array]" = OrderedDict()
+        # Keys known to be over a limit until the given second. Read without the lock.
+        self.cooldown_until: Dict[str, int] = {}
+        self.lock = threading.Lock()
+        self.calls_since_gc = 0
+
+
+class RateLimiter:
+    """Per-user rate limiter keyed by endpoint type and subscription tier."""
+
+    TIER_LIMITS: Dict[str, Dict[str, Dict[str, int]]] = {
+        'free': {
+            'general': {'requests_per_minute': 30, 'requests_per_hour': 500, 'requests_per_day': 2000},
+            'processing': {'requests_per_minute': 2, 'requests_per_hour': 10, 'requests_per_day': 20},
+            'upload': {'requests_per_minute': 5, 'requests_per_hour': 20, 'requests_per_day': 50}
+        },
+        'basic': {
+            'general': {'requests_per_minute': 60, 'requests_per_hour': 1000, 'requests_per_day': 10000},
+            'processing': {'requests_per_minute': 5, 'requests_per_hour': 30, 'requests_per_day': 100},
+            'upload': {'requests_per_minute': 10, 'requests_per_hour': 60, 'requests_per_day': 200}
+        },
+        'pro': {
+            'general': {'requests_per_minute': 120, 'requests_per_hour': 3000, 'requests_per_day': 30000},
+            'processing': {'requests_per_minute': 10, 'requests_per_hour': 100, 'requests_per_day': 500},
+            'upload': {'requests_per_minute': 20, 'requests_per_hour': 200, 'requests_per_day': 1000}
+        },
+        'enterprise': {
+            'general': {'requests_per_minute': 300, 'requests_per_hour': 10000, 'requests_per_day': 100000},
+            'processing': {'requests_per_minute': 30, 'requests_per_hour': 500, 'requests_per_day': 5000},
+            'upload': {'requests_per_minute': 60, 'requests_per_hour': 1000, 'requests_per_day': 10000}
+        }
+    }
+
+    def __init__(self, max_keys: int = 100_000, gc_every: int = 1024, num_shards: int = 64,
+                 clock: Callable[[], float] = time.monotonic):
+        """
+        Initialize empty counters.
+
+        Args:
+            max_keys: Maximum number of tracked keys before the least recently used is evicted
+            gc_every: Number of checks per shard between sweeps for expired keys
+            num_shards: Number of independently locked counter shards
+            clock: Monotonic clock in seconds; injectable so tests can control time
+        """
+        self._clock = clock
+        self._flat_limits = self._build_flat_limits()
+        self._shards = [_Shard() for _ in range(num_shards)]
+        self._max_keys_per_shard = max(1, max_keys // num_shards)
+        self._gc_every = gc_every
+
+    def _build_flat_limits(self) -> Dict[Tuple[str, str], Tuple[int, int, int]]:
+        """Flatten TIER_LIMITS into (tier, endpoint_type) -> (per minute, per hour, per day)."""
+        return {
+            (tier, endpoint_type): tuple(limits[limit_name] for _, _, limit_name in _WINDOWS)
+            for tier, endpoint_limits in self.TIER_LIMITS.items()
+            for endpoint_type, limits in endpoint_limits.items()
+        }
+
+    def _get_limits(self, tier: str, endpoint_type: str) -> Tuple[int, int, int]:
+        """Get the limits for a tier and endpoint type, falling back to general and then free."""
+        flat_limits = self._flat_limits
+        return (
+            flat_limits.get((tier, endpoint_type))
+            or flat_limits.get((tier, 'general'))
+            or flat_limits.get(('free', endpoint_type))
+            or flat_limits[('free', 'general')]
+        )
+
+    def _shard_for(self, key: str) -> "_Shard":
+        """Pick the shard that owns a key."""
+        return self._shards[hash(key) % len(self._shards)]
+
+    def _get_counter(self, shard: "_Shard", key: str, now: int) -> array:
+        """Get (or create) the counter for a key and mark it as recently used. Caller holds the shard lock."""
+        shard.calls_since_gc += 1
+        if shard.calls_since_gc >= self._gc_every:
+            self._collect_expired(shard, now)
+
+        counters = shard.counters
+        counter = counters.get(key)
+        if counter is None:
+            counter = counters[key] = _new_counter()
+            if len(counters) > self._max_keys_per_shard:
+                evicted_key, _ = counters.popitem(last=False)
+                shard.cooldown_until.pop(evicted_key, None)
+        else:
+            counters.move_to_end(key)
+
+        return counter
+
+    @staticmethod
+    def _collect_expired(shard: "_Shard", now: int) -> None:
+        """
+        Drop keys with no requests in the current or previous day bucket. Caller holds the shard lock.
+
+        Keys are ordered by last use, so the sweep stops at the first live one.
+        """
+        shard.calls_since_gc = 0
+        counters = shard.counters
+        oldest_live_day = now // DAY - 1
+        expired = 0
+
+        while counters:
+            key, counter = next(iter(counters.items()))
+            if counter[8] >= oldest_live_day:
+                break
+            del counters[key]
+            shard.cooldown_until.pop(key, None)
+            expired += 1
+
+        if expired:
+            logger.debug(f"Rate limiter dropped {expired} expired keys")
+
+    def check_rate(self, user_id: str, endpoint_type: str = 'general', tier: str = 'free') -> bool:
+        """
+        Record a request and return whether it is within the user's limits.
+
+        Args:
+            user_id: ID of the user making the request
+            endpoint_type: "general", "processing" or "upload"
+            tier: Subscription tier of the user
+
+        Returns:
+            True if the request is allowed, False if any window is exhausted
+        """
+        allowed, _ = self.check_rate_limit(user_id, endpoint_type, tier)
+        return allowed
+
+    def check_rate_limit(self, user_id: str, endpoint_type: str = 'general', tier: str = 'free') -> Tuple[bool, int]:
+        """
+        Record a request and return whether it is allowed plus the retry delay.
+
+        Returns:
+            (allowed, retry_after) where retry_after is 0 for allowed requests and
+            otherwise the number of seconds until the exhausted window has room
+        """
+        limits = self._get_limits(tier, endpoint_type)
+        key = f"{user_id}:{endpoint_type}"
+        shard = self._shard_for(key)
+        # Whole seconds from the monotonic clock: immune to wall-clock jumps
+        now = int(self._clock())
+
+        # Fast path: a rejected key stays rejected until its retry-after passes,
+        # since rejected requests do not change the counters
+        cooldown_until = shard.cooldown_until.get(key)
+        if cooldown_until is not None:
+            if now < cooldown_until:
+                return False, cooldown_until - now
+            shard.cooldown_until.pop(key, None)
+
+        with shard.lock:
+            counter = self._get_counter(shard, key, now)
+
+            for (offset, window, limit_name, count), limit in zip(_window_counts(counter, now), limits):
+                if count >= limit:
+                    logger.debug(f"Rate limit {limit_name} reached for {key}")
+                    retry_after = _retry_after(counter[offset], counter[offset + 1], limit, window, now % window)
+                    shard.cooldown_until[key] = now + retry_after
+                    return False, retry_after
+
+            counter[0] += 1
+            counter[3] += 1
+            counter[6] += 1
+
+        return True, 0
+
+    def get_usage_stats(self, user_id: str, endpoint_type: str = 'general', tier: str = 'free') -> Dict[str, Any]:
+        """Get a user's current (approximate) usage and limits without recording a request."""
+        limits = self._get_limits(tier, endpoint_type)
+        key = f"{user_id}:{endpoint_type}"
+        shard = self._shard_for(key)
+        now = int(self._clock())
+
+        with shard.lock:
+            counter = shard.counters.get(key)
+            if counter is None:
+                counts = [0, 0, 0]
+            else:
+                counts = [count for _, _, _, count in _window_counts(counter, now)]
+
+        return self._format_usage_stats(tier, endpoint_type, limits, counts)
+
+    @staticmethod
+    def _format_usage_stats(tier: str, endpoint_type: str, limits: Tuple[int, int, int],
+                            counts: List[float]) -> Dict[str, Any]:
+        """Build the usage stats response shared by every backend."""
+        return {
+            'tier': tier,
+            'endpoint_type': endpoint_type,
+            'limits': {limit_name: limit for (_, _, limit_name), limit in zip(_WINDOWS, limits)},
+            'current_usage': {limit_name: math.ceil(count) for (_, _, limit_name), count in zip(_WINDOWS, counts)}
+        }
+
+    def reset(self, user_id: str = None) -> None:
+        """Clear counters for one user, or for everyone if no user is given."""
+        prefix = None if user_id is None else f"{user_id}:"
+
+        for shard in self._shards:
+            with shard.lock:
+                if prefix is None:
+                    shard.counters.clear()
+                    shard.cooldown_until.clear()
+                    continue
+
+                for key in [k for k in shard.counters if k.startswith(prefix)]:
+                    del shard.counters[key]
+                    shard.cooldown_until.pop(key, None)
+
+
+class RedisRateLimiter(RateLimiter):
+    """Rate limiter backed by Redis fixed-window counters, shared by every worker and host."""
+
+    # Weight each window's previous bucket like the in-memory limiter and, if
+    # every window has room, INCR the current buckets. Runs atomically and
+    # returns {0} when allowed or {window number, current, previous} when not.
+    # KEYS: (current, previous) bucket keys for the minute, hour and day windows
+    # ARGV: now, three window lengths, three limits
+    SLIDING_WINDOW_SCRIPT = """
+    local now = tonumber(ARGV[1])
+    for i = 1, 3 do
+        local window = tonumber(ARGV[1 + i])
+        local current = tonumber(redis.call('GET', KEYS[2 * i - 1]) or 0)
+        local previous = tonumber(redis.call('GET', KEYS[2 * i]) or 0)
+        local remaining = window - (now % window)
+        if current + previous * remaining / window >= tonumber(ARGV[4 + i]) then
+            return {i, current, previous}
+        end
+    end
+    for i = 1, 3 do
+        redis.call('INCR', KEYS[2 * i - 1])
+        redis.call('EXPIRE', KEYS[2 * i - 1], 2 * tonumber(ARGV[1 + i]))
+    end
+    return {0}
+    """
+
+    def __init__(self, redis_url: str):
+        """Initialize the Redis client and register the sliding window script."""
+        self._flat_limits = self._build_flat_limits()
+        self.client = redis.Redis.from_url(redis_url)
+        self._sliding_window = self.client.register_script(self.SLIDING_WINDOW_SCRIPT)
+
+    @staticmethod
+    def _key_prefix(user_id: str, endpoint_type: str) -> str:
+        """Key prefix with a hash tag so all windows of a key live in one cluster slot."""
+        return f"rl:{{{user_id}:{endpoint_type}}}"
+
+    @staticmethod
+    def _window_keys(prefix: str, now: float) -> List[str]:
+        """(current, previous) bucket keys for the minute, hour and day windows."""
+        keys = []
+        for _, window, _ in _WINDOWS:
+            window_index = int(now // window)
+            keys.append(f"{prefix}:{window}:{window_index}")
+            keys.append(f"{prefix}:{window}:{window_index - 1}")
+        return keys
+
+    def check_rate_limit(self, user_id: str, endpoint_type: str = 'general', tier: str = 'free') -> Tuple[bool, int]:
+        """Record a request and return whether it is allowed plus the retry delay."""
+        limits = self._get_limits(tier, endpoint_type)
+        prefix = self._key_prefix(user_id, endpoint_type)
+        # Wall-clock time so every worker and host agrees on bucket boundaries
+        now = time.time()
+
+        try:
+            result = self._sliding_window(
+                keys=self._window_keys(prefix, now),
+                args=[now, MINUTE, HOUR, DAY, *limits]
+            )
+        except Exception as e:
+            # Fail open: a Redis outage should not take the API down with it
+            logger.error(f"Redis rate limit check error: {str(e)}")
+            return True, 0
+
+        if not result[0]:
+            return True, 0
+
+        _, window, _ = _WINDOWS[result[0] - 1]
+        return False, _retry_after(int(result[1]), int(result[2]), limits[result[0] - 1], window, now % window)
+
+    def get_usage_stats(self, user_id: str, endpoint_type: str = 'general', tier: str = 'free') -> Dict[str, Any]:
+        """Get a user's current (approximate) usage and limits without recording a request."""
+        limits = self._get_limits(tier, endpoint_type)
+        now = time.time()
+
+        try:
+            values = self.client.mget(self._window_keys(self._key_prefix(user_id, endpoint_type), now))
+        except Exception as e:
+            logger.error(f"Redis rate limit stats error: {str(e)}")
+            values = [None] * 6
+
+        counts = [
+            _weighted_count(int(values[2 * i] or 0), int(values[2 * i + 1] or 0), window, now % window)
+            for i, (_, window, _) in enumerate(_WINDOWS)
+        ]
+        return self._format_usage_stats(tier, endpoint_type, limits, counts)
+
+    def reset(self, user_id: str = None) -> None:
+        """Clear counters for one user, or for everyone if no user is given."""
+        pattern = "rl:*" if user_id is None else f"rl:{{{user_id}:*"
+        try:
+            for key in self.client.scan_iter(match=pattern):
+                self.client.delete(key)
+        except Exception as e:
+            logger.error(f"Redis rate limit reset error: {str(e)}")
+
+
+def create_rate_limiter() -> RateLimiter:
+    """Create a Redis-backed rate limiter if configured, otherwise an in-memory one."""
+    redis_url = os.environ.get('REDIS_URL')
+
+    if redis_url and HAS_REDIS:
+        try:
+            limiter = RedisRateLimiter(redis_url)
+            logger.info("Rate limiter using Redis backend")
+            return limiter
+        except Exception as e:
+            logger.warning(f"Failed to initialize Redis rate limiter, using in-memory limits: {e}")
+    elif redis_url:
+        logger.warning("REDIS_URL is set but the redis client is not installed, using in-memory limits")
+
+    return RateLimiter()
+
+
+# Global rate limiter instance
+rate_limiter = create_rate_limiter()
@@ -4,7 +4,11 @@ Complete replacement for SQLAlchemy with pure Supabase operations.
 """
 
 import os
+import time
+import atexit
 import logging
+import threading
+from collections import defaultdict
 from typing import Optional, Dict, Any, List, Union
 from datetime import datetime, timedelta
 import uuid
@@ -28,6 +32,101 @@ except ImportError:
 
 logger = logging.getLogger(__name__)
 
+# Seconds between background flushes of buffered API key usage and last_login times
+USAGE_FLUSH_INTERVAL = 5
+
+# Cached user rows stay fresh for this many seconds
+USER_CACHE_TTL = 60
+USER_CACHE_MAX_SIZE = 10000
+
+# Subscriptions and API key lists change rarely; cache them briefly per user
+USER_DATA_CACHE_TTL = 30
+USER_DATA_CACHE_MAX_SIZE = 5000
+
+# Rows per INSERT when creating jobs in bulk
+JOB_INSERT_BATCH_SIZE = 1000
+
+# Columns returned when listing a user's API keys (never the key hashes)
+API_KEY_LIST_COLUMNS = "id,user_id,name,key_prefix,is_active,usage_count,last_used,created_at"
+
+# Per-tier processing limits, built once at import
+PLAN_LIMITS = {
+    'free': {
+        'monthly_limit': 5,
+        'file_size_limit': 100 * 1024 * 1024,  # 100MB
+        'duration_limit': 300,  # 5 minutes
+        'whisper_model': 'base'  # Base model for free tier
+    },
+    'basic': {
+        'monthly_limit': 50,
+        'file_size_limit': 500 * 1024 * 1024,  # 500MB
+        'duration_limit': 1800,  # 30 minutes
+        'whisper_model': 'medium'  # Medium model for basic tier
+    },
+    'pro': {
+        'monthly_limit': 200,
+        'file_size_limit': 1024 * 1024 * 1024,  # 1GB
+        'duration_limit': 3600,  # 60 minutes
+        'whisper_model': 'medium'  # Keep medium for pro
+    },
+    'enterprise': {
+        'monthly_limit': -1,  # Unlimited
+        'file_size_limit': 2 * 1024 * 1024 * 1024,  # 2GB
+        'duration_limit': 7200,  # 120 minutes
+        'whisper_model': 'large'  # Large model for enterprise
+    }
+}
+
+
+def _now_iso() -> str:
+    """Current UTC time as an ISO-8601 string for timestamp columns."""
+    return datetime.utcnow().isoformat()
+
+
+def _is_missing_column_error(error: Exception, column: str) -> bool:
+    """True if a PostgREST error says ``column`` does not exist (42703 on filters, PGRST204 on writes)."""
+    message = str(error)
+    return column in message and ("42703" in message or "PGRST204" in message)
+
+
+class _TTLCache:
+    """Small thread-safe TTL cache that evicts the oldest entry when full."""
+    
+    def __init__(self, maxsize: int, ttl: float):
+        self.maxsize = maxsize
+        self.ttl = ttl
+        self._data: Dict[Any, Any] = {}
+        self._lock = threading.Lock()
+    
+    def get(self, key: Any) -> Any:
+        """Return the cached value, or None if missing or expired."""
+        entry = self._data.get(key)
+        if entry is None:
+            return None
+        if entry[0] <= time.monotonic():
+            self.pop(key)
+            return None
+        return entry[1]
+    
+    def set(self, key: Any, value: Any) -> None:
+        """Cache a value for ``ttl`` seconds."""
+        with self._lock:
+            self._data.pop(key, None)
+            if len(self._data) >= self.maxsize:
+                self._data.pop(next(iter(self._data)), None)
+            self._data[key] = (time.monotonic() + self.ttl, value)
+    
+    def pop(self, key: Any) -> None:
+        """Remove a key if present."""
+        with self._lock:
+            self._data.pop(key, None)
+    
+    def clear(self) -> None:
+        """Remove every entry."""
+        with self._lock:
+            self._data.clear()
+
+
 class SupabaseService:
     """Complete database service using Supabase."""
     
@@ -47,6 +146,27 @@ class SupabaseService:
         self.client = create_client(self.supabase_url, self.supabase_service_key)
         logger.info("Supabase service initialized with service key")
         
+        # Per-process caches of user rows looked up on every login and authenticated request
+        self._user_by_id_cache = _TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL)
+        self._user_by_email_cache = _TTLCache(USER_CACHE_MAX_SIZE, USER_CACHE_TTL)
+        self._subscription_cache = _TTLCache(USER_DATA_CACHE_MAX_SIZE, USER_DATA_CACHE_TTL)
+        self._api_keys_cache = _TTLCache(USER_DATA_CACHE_MAX_SIZE, USER_DATA_CACHE_TTL)
+        
+        # Buffered API key usage and login times, written in batches off the request path
+        self._usage_lock = threading.Lock()
+        self._usage_deltas: Dict[str, int] = defaultdict(int)
+        self._last_used: Dict[str, float] = {}
+        self._last_logins: Dict[str, float] = {}
+        self._has_usage_rpc = True
+        # Cleared if the key_lookup_hash migration has not been applied yet
+        self._has_key_lookup_hash = True
+        # Cleared if users.email has no unique index to use as an ON CONFLICT target
+        self._has_email_conflict_target = True
+        self._usage_stop = threading.Event()
+        self._usage_flusher = threading.Thread(target=self._usage_flush_loop, name="usage-flusher", daemon=True)
+        self._usage_flusher.start()
+        atexit.register(self.stop_usage_flusher)
+        
         # Ensure storage buckets exist
         self.ensure_storage_buckets()
     
@@ -54,12 +174,12 @@ class SupabaseService:
     def create_user(self, email: str, password: str, full_name: str = None) -> Dict[str, Any]:
         """Create a new user with simple password storage (no Supabase Auth)."""
         try:
-            # Check if user already exists
-            existing_user = self.get_user_by_email(email)
-            if existing_user:
+            # Known users are rejected without touching the database
+            if self._user_by_email_cache.get(email) is not None:
                 return {"success": False, "error": "User already exists"}
             
             # Create user data
+            now = _now_iso()
             user_data = {
                 "id": str(uuid.uuid4()),
                 "email": email,
@@ -68,21 +188,39 @@ class SupabaseService:
                 "subscription_tier": "free",
                 "is_active": True,
                 "is_verified": False,
-                "created_at": datetime.utcnow().isoformat(),
-                "updated_at": datetime.utcnow().isoformat()
+                "created_at": now,
+                "updated_at": now
             }
             
-            # Insert user into database
-            result = self.client.table("users").insert(user_data).execute()
+            # Insert unless the email is taken (ON CONFLICT DO NOTHING): one round trip, no race
+            result = None
+            if self._has_email_conflict_target:
+                try:
+                    result = self.client.table("users")\
+                        .upsert(user_data, on_conflict="email", ignore_duplicates=True)\
+                        .execute()
+                except Exception as e:
+                    # 42P10: no unique index matches the ON CONFLICT target
+                    if "42P10" not in str(e):
+                        raise
+                    logger.warning("users.email has no unique index, creating users with check-then-insert")
+                    self._has_email_conflict_target = False
+            
+            if result is None:
+                existing = self.client.table("users").select("id").eq("email", email).limit(1).execute()
+                if existing.data:
+                    return {"success": False, "error": "User already exists"}
+                result = self.client.table("users").insert(user_data).execute()
             
             if result.data:
                 logger.info(f"User created successfully: {email}")
+                self._cache_user(result.data[0])
                 return {
                     "success": True,
                     "user": result.data[0]
                 }
             else:
-                return {"success": False, "error": "Failed to create user"}
+                return {"success": False, "error": "User already exists"}
                 
         except Exception as e:
             logger.error(f"User creation error: {str(e)}")
@@ -118,14 +256,8 @@ class SupabaseService:
             
             refresh_token = create_refresh_token(identity=user_data['id'])
             
-            # Update last login asynchronously (non-blocking)
-            try:
-                self.client.table("users").update({
-                    "last_login": datetime.utcnow().isoformat()
-                }).eq("id", user_data['id']).execute()
-            except Exception as login_update_error:
-                # Don't fail login if last_login update fails
-                logger.warning(f"Failed to update last_login: {login_update_error}")
+            # Update last login asynchronously (written by the background flusher)
+            self.record_last_login(user_data['id'])
             
             return {
                 "success": True,
@@ -139,27 +271,66 @@ class SupabaseService:
             return {"success": False, "error": "Authentication failed"}
     
     def get_user_by_id(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user by ID."""
+        """Get user by ID (cached for USER_CACHE_TTL seconds)."""
+        cached_user = self._user_by_id_cache.get(user_id)
+        if cached_user is not None:
+            return dict(cached_user)
+        
         try:
-            result = self.client.table("users").select("*").eq("id", user_id).execute()
-            return result.data[0] if result.data else None
+            result = self.client.table("users").select("*").eq("id", user_id).limit(1).execute()
+            if not result.data:
+                return None
+            
+            self._cache_user(result.data[0])
+            return dict(result.data[0])
         except Exception as e:
             logger.error(f"Get user error: {str(e)}")
             return None
     
     def get_user_by_email(self, email: str) -> Optional[Dict[str, Any]]:
-        """Get user by email."""
+        """Get user by email (cached for USER_CACHE_TTL seconds)."""
+        cached_user = self._user_by_email_cache.get(email)
+        if cached_user is not None:
+            return dict(cached_user)
+        
         try:
-            result = self.client.table("users").select("*").eq("email", email).execute()
-            return result.data[0] if result.data else None
+            result = self.client.table("users").select("*").eq("email", email).limit(1).execute()
+            if not result.data:
+                return None
+            
+            self._cache_user(result.data[0])
+            return dict(result.data[0])
         except Exception as e:
             logger.error(f"Get user by email error: {str(e)}")
             return None
     
+    def _cache_user(self, user: Dict[str, Any]) -> None:
+        """Cache a user row under both its id and its email."""
+        self._user_by_id_cache.set(user['id'], user)
+        if user.get('email'):
+            self._user_by_email_cache.set(user['email'], user)
+    
+    def invalidate_user_cache(self, user_id: str, email: str = None) -> None:
+        """Drop a user's cached rows, including under any previously cached email."""
+        cached_user = self._user_by_id_cache.get(user_id)
+        if cached_user is not None and cached_user.get('email'):
+            self._user_by_email_cache.pop(cached_user['email'])
+        if email:
+            self._user_by_email_cache.pop(email)
+        self._user_by_id_cache.pop(user_id)
+    
+    def clear_user_cache(self) -> None:
+        """Drop every cached user row, subscription and API key list (e.g. after changes made outside this service)."""
+        self._user_by_id_cache.clear()
+        self._user_by_email_cache.clear()
+        self._subscription_cache.clear()
+        self._api_keys_cache.clear()
+    
     def update_user(self, user_id: str, data: Dict[str, Any]) -> Dict[str, Any]:
         """Update user data."""
         try:
             result = self.client.table("users").update(data).eq("id", user_id).execute()
+            self.invalidate_user_cache(user_id, data.get('email'))
             return {
                 "success": True,
                 "user": result.data[0] if result.data else None
@@ -173,8 +344,8 @@ class SupabaseService:
         """Create a new job."""
         try:
             job_data['user_id'] = user_id
-            job_data['id'] = str(uuid.uuid4())
             
+            # id comes from the column default (gen_random_uuid()) and is returned with the row
             result = self.client.table("jobs").insert(job_data).execute()
             return {
                 "success": True,
@@ -184,6 +355,29 @@ class SupabaseService:
             logger.error(f"Create job error: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def create_jobs(self, user_id: str, jobs: List[Dict[str, Any]]) -> Dict[str, Any]:
+        """
+        Create many jobs with one multi-row INSERT per JOB_INSERT_BATCH_SIZE rows.
+        
+        Args:
+            user_id: Owner of every job
+            jobs: Job rows to insert
+            
+        Returns:
+            Dict with success flag and the created jobs (those from earlier batches on failure)
+        """
+        created: List[Dict[str, Any]] = []
+        try:
+            for start in range(0, len(jobs), JOB_INSERT_BATCH_SIZE):
+                batch = [{**job, 'user_id': user_id} for job in jobs[start:start + JOB_INSERT_BATCH_SIZE]]
+                result = self.client.table("jobs").insert(batch).execute()
+                created.extend(result.data or [])
+            
+            return {"success": True, "jobs": created}
+        except Exception as e:
+            logger.error(f"Create jobs error: {str(e)}")
+            return {"success": False, "error": str(e), "jobs": created}
+    
     def get_job(self, job_id: str, user_id: str = None) -> Optional[Dict[str, Any]]:
         """Get job by ID."""
         try:
@@ -191,7 +385,7 @@ class SupabaseService:
             if user_id:
                 query = query.eq("user_id", user_id)
             
-            result = query.execute()
+            result = query.limit(1).execute()
             return result.data[0] if result.data else None
         except Exception as e:
             logger.error(f"Get job error: {str(e)}")
@@ -228,65 +422,118 @@ class SupabaseService:
             return {"success": False, "error": str(e)}
     
     def get_plan_limits(self, subscription_tier: str) -> Dict[str, Any]:
-        """Get plan limits for a subscription tier."""
-        plan_limits = {
-            'free': {
-                'monthly_limit': 5,
-                'file_size_limit': 100 * 1024 * 1024,  # 100MB
-                'duration_limit': 300,  # 5 minutes
-                'whisper_model': 'base'  # Base model for free tier
-            },
-            'basic': {
-                'monthly_limit': 50,
-                'file_size_limit': 500 * 1024 * 1024,  # 500MB
-                'duration_limit': 1800,  # 30 minutes
-                'whisper_model': 'medium'  # Medium model for basic tier
-            },
-            'pro': {
-                'monthly_limit': 200,
-                'file_size_limit': 1024 * 1024 * 1024,  # 1GB
-                'duration_limit': 3600,  # 60 minutes
-                'whisper_model': 'medium'  # Keep medium for pro
-            },
-            'enterprise': {
-                'monthly_limit': -1,  # Unlimited
-                'file_size_limit': 2 * 1024 * 1024 * 1024,  # 2GB
-                'duration_limit': 7200,  # 120 minutes
-                'whisper_model': 'large'  # Large model for enterprise
-            }
-        }
-        
-        return plan_limits.get(subscription_tier, plan_limits['free'])
+        """Get plan limits for a subscription tier (shared dict, do not mutate)."""
+        return PLAN_LIMITS.get(subscription_tier, PLAN_LIMITS['free'])
     
     def increment_api_key_usage(self, api_key_id: str) -> bool:
-        """Increment API key usage counter."""
+        """Record one use of an API key; the counter is written by the background flusher."""
+        with self._usage_lock:
+            self._usage_deltas[api_key_id] += 1
+            self._last_used[api_key_id] = time.time()
+        return True
+    
+    def flush_api_key_usage(self) -> int:
+        """Write buffered API key usage to the database. Returns the number of keys updated."""
+        with self._usage_lock:
+            deltas, self._usage_deltas = self._usage_deltas, defaultdict(int)
+            last_used, self._last_used = self._last_used, {}
+        
+        flushed = 0
+        for api_key_id, delta in deltas.items():
+            try:
+                self._add_api_key_usage(api_key_id, delta, datetime.utcfromtimestamp(last_used[api_key_id]).isoformat())
+                flushed += 1
+            except Exception as e:
+                logger.error(f"Flush API key usage error: {str(e)}")
+                # Keep the delta so the next flush retries it
+                with self._usage_lock:
+                    self._usage_deltas[api_key_id] += delta
+                    self._last_used.setdefault(api_key_id, last_used[api_key_id])
+        
+        return flushed
+    
+    def _add_api_key_usage(self, api_key_id: str, delta: int, last_used: str) -> None:
+        """Add delta to a key's usage_count, atomically via RPC when the database function exists."""
+        if self._has_usage_rpc:
+            try:
+                self.client.rpc("increment_api_key_usage", {
+                    "p_id": api_key_id,
+                    "p_delta": delta,
+                    "p_last_used": last_used
+                }).execute()
+                return
+            except Exception as e:
+                # PGRST202: function not found; anything else is a real failure
+                if "PGRST202" not in str(e):
+                    raise
+                logger.warning("increment_api_key_usage function missing, using read-modify-write")
+                self._has_usage_rpc = False
+        
+        result = self.client.table("api_keys").select("usage_count").eq("id", api_key_id).execute()
+        if not result.data:
+            return
+        
+        self.client.table("api_keys").update({
+            "usage_count": (result.data[0].get('usage_count') or 0) + delta,
+            "last_used": last_used
+        }).eq("id", api_key_id).execute()
+    
+    def record_last_login(self, user_id: str) -> None:
+        """Record a login; last_login is written by the background flusher."""
+        with self._usage_lock:
+            self._last_logins[user_id] = time.time()
+    
+    def flush_last_logins(self) -> int:
+        """Write buffered last_login times to the database. Returns the number of users updated."""
+        with self._usage_lock:
+            last_logins, self._last_logins = self._last_logins, {}
+        
+        flushed = 0
+        for user_id, logged_in_at in last_logins.items():
+            try:
+                self.client.table("users").update({
+                    "last_login": datetime.utcfromtimestamp(logged_in_at).isoformat()
+                }).eq("id", user_id).execute()
+                flushed += 1
+            except Exception as e:
+                # Don't retry: a later login will record a newer time anyway
+                logger.warning(f"Failed to update last_login: {e}")
+        
+        return flushed
+    
+    def _usage_flush_loop(self):
+        """Background loop that periodically flushes buffered API key usage and logins."""
+        while not self._usage_stop.wait(USAGE_FLUSH_INTERVAL):
+            try:
+                self.flush_api_key_usage()
+                self.flush_last_logins()
+            except Exception as e:
+                logger.error(f"Usage flusher error: {str(e)}")
+    
+    def stop_usage_flusher(self, timeout: float = 5.0):
+        """
+        Stop the background flusher and write out anything still buffered.
+        
+        Registered with atexit so usage recorded just before shutdown is not lost.
+        
+        Args:
+            timeout: Seconds to wait for an in-progress flush to finish
+        """
+        self._usage_stop.set()
+        if self._usage_flusher.is_alive() and self._usage_flusher is not threading.current_thread():
+            self._usage_flusher.join(timeout)
+        
         try:
-            # Get current usage
-            result = self.client.table("api_keys").select("usage_count").eq("id", api_key_id).execute()
-            
-            if result.data:
-                current_usage = result.data[0].get('usage_count', 0)
-                new_usage = current_usage + 1
-                
-                # Update usage
-                self.client.table("api_keys").update({
-                    "usage_count": new_usage,
-                    "last_used": datetime.utcnow().isoformat()
-                }).eq("id", api_key_id).execute()
-                
-                return True
-            
-            return False
-            
+            self.flush_api_key_usage()
+            self.flush_last_logins()
         except Exception as e:
-            logger.error(f"Increment API key usage error: {str(e)}")
-            return False
+            logger.error(f"Final usage flush error: {str(e)}")
     
     # API Key Management
     def create_api_key(self, user_id: str, name: str) -> Dict[str, Any]:
         """Create a new API key using secure utility functions."""
         try:
-            from utils.security_utils import generate_secure_api_key
+            from utils.security_utils import generate_secure_api_key, compute_api_key_lookup_hash
             
             # Validate inputs to prevent database constraint violations
             if len(user_id) > 128:
@@ -315,7 +562,21 @@ class SupabaseService:
                 "usage_count": 0
             }
             
-            result = self.client.table("api_keys").insert(api_key_data).execute()
+            result = None
+            if self._has_key_lookup_hash:
+                try:
+                    result = self.client.table("api_keys").insert(
+                        {**api_key_data, "key_lookup_hash": compute_api_key_lookup_hash(raw_key)}
+                    ).execute()
+                except Exception as e:
+                    if not _is_missing_column_error(e, "key_lookup_hash"):
+                        raise
+                    logger.warning("api_keys.key_lookup_hash column missing, storing key without lookup hash")
+                    self._has_key_lookup_hash = False
+            
+            if result is None:
+                result = self.client.table("api_keys").insert(api_key_data).execute()
+            self._api_keys_cache.pop(user_id)
             
             if result.data:
                 return {
@@ -341,7 +602,7 @@ class SupabaseService:
         """Verify an API key and return the key data if valid using constant-time comparison."""
         try:
             # Import the secure verification function
-            from utils.security_utils import verify_api_key as secure_verify_api_key
+            from utils.security_utils import verify_api_key as secure_verify_api_key, compute_api_key_lookup_hash
             
             # Extract key prefix (first 10 characters) to limit database query
             if not raw_key or len(raw_key) < 10:
@@ -349,29 +610,40 @@ class SupabaseService:
                 return None
                 
             key_prefix = raw_key[:10]
-            
-            # Query only keys with matching prefix for better performance
-            result = self.client.table("api_keys").select("*")\
-                .eq("is_active", True)\
-                .eq("key_prefix", key_prefix)\
-                .execute()
-            
-            # If no keys with this prefix, try a broader search as fallback
-            if not result.data:
-                # Limited fallback query for active keys
+            lookup_hash = compute_api_key_lookup_hash(raw_key)
+            
+            # Indexed equality lookup on the deterministic key hash
+            result = None
+            if self._has_key_lookup_hash:
+                try:
+                    result = self.client.table("api_keys").select("*")\
+                        .eq("is_active", True)\
+                        .eq("key_lookup_hash", lookup_hash)\
+                        .limit(1)\
+                        .execute()
+                except Exception as e:
+                    if not _is_missing_column_error(e, "key_lookup_hash"):
+                        raise
+                    logger.warning("api_keys.key_lookup_hash column missing, verifying keys by prefix")
+                    self._has_key_lookup_hash = False
+            
+            # Keys created before key_lookup_hash existed: match on prefix instead
+            if result is None or not result.data:
                 result = self.client.table("api_keys").select("*")\
                     .eq("is_active", True)\
-                    .limit(100)\
+                    .eq("key_prefix", key_prefix)\
                     .execute()
             
             # Use constant-time comparison to verify key
             for key_data in result.data or []:
                 if secure_verify_api_key(key_data['key_hash'], raw_key):
-                    # Update usage count and last used
-                    self.client.table("api_keys").update({
-                        "usage_count": key_data['usage_count'] + 1,
-                        "last_used": datetime.utcnow().isoformat()
-                    }).eq("id", key_data['id']).execute()
+                    # Backfill the lookup hash so the next request takes the indexed path
+                    if self._has_key_lookup_hash and key_data.get('key_lookup_hash') != lookup_hash:
+                        self.client.table("api_keys").update({"key_lookup_hash": lookup_hash})\
+                            .eq("id", key_data['id']).execute()
+                    
+                    # Update usage count and last used (batched, off the request path)
+                    self.increment_api_key_usage(key_data['id'])
                     
                     return key_data
             
@@ -383,14 +655,20 @@ class SupabaseService:
             return None
     
     def get_user_api_keys(self, user_id: str) -> List[Dict[str, Any]]:
-        """Get user's API keys."""
+        """Get user's API keys (cached for USER_DATA_CACHE_TTL seconds)."""
+        cached_keys = self._api_keys_cache.get(user_id)
+        if cached_keys is not None:
+            return [dict(key) for key in cached_keys]
+        
         try:
-            result = self.client.table("api_keys").select("*")\
+            result = self.client.table("api_keys").select(API_KEY_LIST_COLUMNS)\
                 .eq("user_id", user_id)\
                 .order("created_at", desc=True)\
                 .execute()
             
-            return result.data or []
+            api_keys = result.data or []
+            self._api_keys_cache.set(user_id, api_keys)
+            return [dict(key) for key in api_keys]
         except Exception as e:
             logger.error(f"Get user API keys error: {str(e)}")
             return []
@@ -402,6 +680,7 @@ class SupabaseService:
                 .eq("id", key_id)\
                 .eq("user_id", user_id)\
                 .execute()
+            self._api_keys_cache.pop(user_id)
             
             return {"success": True}
         except Exception as e:
@@ -423,6 +702,7 @@ class SupabaseService:
             }
             
             result = self.client.table("subscriptions").insert(subscription_data).execute()
+            self._subscription_cache.pop(user_id)
             return {
                 "success": True,
                 "subscription": result.data[0] if result.data else None
@@ -431,8 +711,34 @@ class SupabaseService:
             logger.error(f"Create subscription error: {str(e)}")
             return {"success": False, "error": str(e)}
     
+    def insert_subscription(self, subscription_data: Dict[str, Any]) -> Dict[str, Any]:
+        """
+        Insert a fully built subscription record, e.g. one created from a payment.
+        
+        Args:
+            subscription_data: Subscription row including user_id
+        
+        Returns:
+            Dict with success flag and the stored subscription
+        """
+        try:
+            result = self.client.table("subscriptions").insert(subscription_data).execute()
+            self._subscription_cache.pop(subscription_data['user_id'])
+            return {
+                "success": True,
+                "subscription": result.data[0] if result.data else None
+            }
+        except Exception as e:
+            logger.error(f"Insert subscription error: {str(e)}")
+            return {"success": False, "error": str(e)}
+    
     def get_user_subscription(self, user_id: str) -> Optional[Dict[str, Any]]:
-        """Get user's active subscription."""
+        """Get user's active subscription (cached for USER_DATA_CACHE_TTL seconds)."""
+        # Entries are 1-tuples so that "no active subscription" is cached too
+        cached = self._subscription_cache.get(user_id)
+        if cached is not None:
+            return dict(cached[0]) if cached[0] else None
+        
         try:
             result = self.client.table("subscriptions").select("*")\
                 .eq("user_id", user_id)\
@@ -441,7 +747,9 @@ class SupabaseService:
                 .limit(1)\
                 .execute()
             
-            return result.data[0] if result.data else None
+            subscription = result.data[0] if result.data else None
+            self._subscription_cache.set(user_id, (subscription,))
+            return dict(subscription) if subscription else None
         except Exception as e:
             logger.error(f"Get user subscription error: {str(e)}")
             return None
@@ -450,6 +758,10 @@ class SupabaseService:
         """Update subscription data."""
         try:
             result = self.client.table("subscriptions").update(data).eq("id", subscription_id).execute()
+            if result.data and result.data[0].get('user_id'):
+                self._subscription_cache.pop(result.data[0]['user_id'])
+            else:
+                self._subscription_cache.clear()
             return {
                 "success": True,
                 "subscription": result.data[0] if result.data else None
@@ -519,13 +831,24 @@ class SupabaseService:
 
 # Global service instance
 _supabase_service: Optional[SupabaseService] = None
+_supabase_service_lock = threading.Lock()
 
 def get_supabase_service() -> SupabaseService:
     """Get or create the global Supabase service instance."""
     global _supabase_service
     if _supabase_service is None:
-        _supabase_service = SupabaseService()
+        with _supabase_service_lock:
+            if _supabase_service is None:
+                _supabase_service = SupabaseService()
     return _supabase_service
 
-# Export the global instance
-supabase_service = get_supabase_service()
+
+class _LazySupabaseService:
+    """Stand-in for the global service that creates it on first attribute access."""
+    
+    def __getattr__(self, name: str) -> Any:
+        return getattr(get_supabase_service(), name)
+
+
+# Export the global instance (connects on first use, not at import)
+supabase_service = _LazySupabaseService()
@@ -0,0 +1,119 @@
+"""
+Tests for the Razorpay payment routes.
+"""
+
+import os
+import unittest
+from importlib.util import find_spec
+from types import SimpleNamespace
+from unittest import mock
+
+HAS_BACKEND_DEPS = all(find_spec(name) for name in ('flask', 'werkzeug', 'supabase'))
+
+
+class _FakeQuery:
+    """Just enough of the PostgREST query builder for the payment routes."""
+
+    def __init__(self, rows):
+        self._rows = rows
+        self._filters = []
+        self._insert = None
+        self._update = None
+        self._limit = None
+
+    def select(self, *args, **kwargs):
+        return self
+
+    def insert(self, data):
+        self._insert = data
+        return self
+
+    def update(self, data):
+        self._update = data
+        return self
+
+    def eq(self, column, value):
+        self._filters.append((column, value))
+        return self
+
+    def order(self, *args, **kwargs):
+        return self
+
+    def limit(self, count):
+        self._limit = count
+        return self
+
+    def execute(self):
+        if self._insert is not None:
+            self._rows.append(dict(self._insert))
+            return SimpleNamespace(data=[dict(self._insert)])
+
+        matched = [row for row in self._rows
+                   if all(row.get(column) == value for column, value in self._filters)]
+        if self._update is not None:
+            for row in matched:
+                row.update(self._update)
+        if self._limit is not None:
+            matched = matched[:self._limit]
+        return SimpleNamespace(data=[dict(row) for row in matched])
+
+
+class _FakeClient:
+    """In-memory tables keyed by name."""
+
+    def __init__(self):
+        self.tables = {'users': [], 'subscriptions': []}
+
+    def table(self, name):
+        return _FakeQuery(self.tables.setdefault(name, []))
+
+
+@unittest.skipUnless(HAS_BACKEND_DEPS, "flask, werkzeug and supabase are required")
+class UpgradeSubscriptionTest(unittest.TestCase):
+    """A successful upgrade must be visible on /status straight away."""
+
+    def setUp(self):
+        from flask import Flask
+        from services import supabase_service as supabase_module
+        from api import payment_routes
+
+        self.client = _FakeClient()
+        self.client.tables['users'].append({'id': 'user-1', 'email': 'a@example.com', 'subscription_tier': 'free'})
+
+        patches = [
+            mock.patch.dict(os.environ, {'SUPABASE_URL': 'http://localhost', 'SUPABASE_SERVICE_KEY': 'test'}),
+            mock.patch.object(supabase_module, 'create_client', return_value=self.client),
+            mock.patch.object(supabase_module.SupabaseService, 'ensure_storage_buckets'),
+            mock.patch.object(supabase_module.atexit, 'register'),
+        ]
+        for patch in patches:
+            patch.start()
+            self.addCleanup(patch.stop)
+
+        self.service = supabase_module.SupabaseService()
+        self.addCleanup(self.service.stop_usage_flusher)
+        service_patch = mock.patch.object(payment_routes, 'supabase_service', self.service)
+        service_patch.start()
+        self.addCleanup(service_patch.stop)
+
+        self.payment_routes = payment_routes
+        app = Flask(__name__)
+        app.register_blueprint(payment_routes.payment_bp)
+        self.http = app.test_client()
+
+    def test_status_reflects_upgrade_immediately(self):
+        # Prime the cache with "no subscription"
+        before = self.http.get('/api/payment/status/user-1').get_json()
+        self.assertIsNone(before['subscription'])
+
+        result = self.payment_routes.upgrade_user_subscription('user-1', 'pro', 30, 'pay_1', 999)
+        self.assertTrue(result['success'])
+
+        after = self.http.get('/api/payment/status/user-1').get_json()
+        self.assertEqual(after['user_tier'], 'pro')
+        self.assertIsNotNone(after['subscription'])
+        self.assertEqual(after['subscription']['payment_id'], 'pay_1')
+
+
+if __name__ == '__main__':
+    unittest.main()
@@ -0,0 +1,47 @@
+"""
+Tests for the in-memory API rate limiter.
+"""
+
+import unittest
+
+from services.rate_limiter import RateLimiter, DAY
+
+
+class RetryAfterTest(unittest.TestCase):
+    """Retry-After must point at the first second a retry is actually allowed."""
+
+    def setUp(self):
+        self.now = 0
+        self.limiter = RateLimiter(clock=lambda: self.now)
+
+    def _check_at(self, now):
+        self.now = now
+        return self.limiter.check_rate_limit('user-1', 'processing', 'free')
+
+    def _exhaust_minute_limit(self, start):
+        """Send requests at ``start`` until the free processing limit (2/min) rejects one."""
+        for _ in range(2):
+            self.assertEqual(self._check_at(start), (True, 0))
+        allowed, retry_after = self._check_at(start)
+        self.assertFalse(allowed)
+        return retry_after
+
+    def test_retry_at_window_boundary_is_allowed(self):
+        start = 10 * DAY
+        retry_after = self._exhaust_minute_limit(start)
+
+        self.assertEqual(retry_after, 61)
+        self.assertFalse(self._check_at(start + retry_after - 1)[0])
+        self.assertEqual(self._check_at(start + retry_after), (True, 0))
+
+    def test_retry_mid_window_is_allowed(self):
+        for offset in (1, 17, 30, 59):
+            with self.subTest(offset=offset):
+                self.limiter.reset()
+                start = 10 * DAY + offset
+                retry_after = self._exhaust_minute_limit(start)
+                self.assertEqual(self._check_at(start + retry_after), (True, 0))
+
+
+if __name__ == '__main__':
+    unittest.main()
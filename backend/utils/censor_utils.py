@@ -7,14 +7,34 @@ from better_profanity import profanity
 from pydub import AudioSegment
 from pydub.generators import Sine
 import os
+import threading
 import numpy as np
 import wave
+from functools import lru_cache
 from typing import Dict, List, Any, Tuple
 
+_filter_lock = threading.Lock()
+_filter_initialized = False
+_custom_words = set()
+
 
 def initialize_profanity_filter():
-    """Initialize the profanity filter with default settings."""
-    profanity.load_censor_words()
+    """Initialize the profanity filter with default settings (once per process)."""
+    global _filter_initialized
+    if _filter_initialized:
+        return
+    
+    with _filter_lock:
+        if not _filter_initialized:
+            profanity.load_censor_words()
+            _is_profane_word.cache_clear()
+            _filter_initialized = True
+
+
+@lru_cache(maxsize=4096)
+def _is_profane_word(clean_word: str) -> bool:
+    """Check a single lowercased, punctuation-free word (memoized; cleared when the word list changes)."""
+    return profanity.contains_profanity(clean_word)
 
 
 def detect_profane_words(text: str) -> List[str]:
@@ -33,7 +53,7 @@ def detect_profane_words(text: str) -> List[str]:
     for word in words:
         # Clean the word of punctuation for better detection
         clean_word = ''.join(char for char in word if char.isalnum())
-        if profanity.contains_profanity(clean_word):
+        if _is_profane_word(clean_word):
             profane_words.append(word)
     
     return profane_words
@@ -60,7 +80,7 @@ def find_profane_segments(transcript_data: Dict[str, Any]) -> List[Dict[str, Any
             word = word_info['word'].strip()
             # Clean the word of punctuation for better detection
             clean_word = ''.join(char for char in word if char.isalnum())
-            if clean_word and detect_profane_words(clean_word):
+            if clean_word and _is_profane_word(clean_word.lower()):
                 profane_segments.append({
                     'text': word,
                     'start': word_info['start'],
@@ -200,11 +220,14 @@ def detect_and_censor_audio(audio_path: str, transcript_data: Dict[str, Any],
             shutil.copy2(audio_path, output_path)
             return 0
         
-        print(f"Found {len(profane_segments)} profane segments to censor:")
+        # Build the summary first and write it in one go rather than one
+        # print per segment
+        summary_lines = [f"Found {len(profane_segments)} profane segments to censor:"]
         for segment in profane_segments:
             segment_type = "word" if segment['type'] == 'word' else "segment"
             duration = segment['end'] - segment['start']
-            print(f"  - {segment_type}: '{segment['text']}' at {segment['start']:.2f}s-{segment['end']:.2f}s ({duration:.2f}s)")
+            summary_lines.append(f"  - {segment_type}: '{segment['text']}' at {segment['start']:.2f}s-{segment['end']:.2f}s ({duration:.2f}s)")
+        print("\n".join(summary_lines), flush=True)
         
         print("Loading audio file...")
         audio = AudioSegment.from_file(audio_path)
@@ -235,7 +258,22 @@ def add_custom_profanity_words(custom_words: List[str]):
     Args:
         custom_words (List[str]): List of words to add to the filter
     """
-    for word in custom_words:
-        profanity.add_censor_words([word])
+    # Load the defaults first so a later initialization can't wipe the custom words
+    initialize_profanity_filter()
+    
+    with _filter_lock:
+        # Skip duplicates and words already added so repeated calls don't
+        # grow better_profanity's variant set
+        new_words = [word for word in dict.fromkeys(custom_words)
+                     if word and word not in _custom_words]
+        if not new_words:
+            return
+        
+        # One call so better_profanity regenerates its word variants only once;
+        # held under the lock so concurrent callers don't mutate its word set together
+        profanity.add_censor_words(new_words)
+        _custom_words.update(new_words)
+        # Drop lookups memoized as clean before these words were added
+        _is_profane_word.cache_clear()
 
 
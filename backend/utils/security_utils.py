@@ -174,6 +174,22 @@ def generate_secure_api_key(prefix: str = "apf") -> Tuple[str, str, str]:
     
     return raw_key, key_prefix, key_hash
 
+def compute_api_key_lookup_hash(raw_key: str) -> str:
+    """
+    Compute a deterministic keyed hash of an API key for indexed lookups.
+    
+    Unlike the salted key_hash this is the same for every call, so the
+    database can find a key with a single equality match.
+    
+    Args:
+        raw_key: The key provided by the user
+        
+    Returns:
+        str: Hex digest of HMAC-SHA256 over the key
+    """
+    secret = os.environ.get('API_KEY_LOOKUP_SECRET') or os.environ.get('SECRET_KEY', '')
+    return hmac.new(secret.encode(), raw_key.encode(), hashlib.sha256).hexdigest()
+
 def secure_compare(val1: str, val2: str) -> bool:
     """
     Compare two strings in constant time to prevent timing attacks.
@@ -1,6 +1,6 @@
 #!/usr/bin/env python3
 """
-Script to check and potentially create the required database schema for jobs table.
+Script to check and potentially create the required database schema for the jobs and api_keys tables.
 """
 
 import os
@@ -59,6 +59,49 @@ CREATE TABLE jobs (
 );
 """)
 
+    print("\n🔍 Checking unique index on users.email...")
+    
+    try:
+        # Re-upserting an existing row with DO NOTHING is a no-op when the index exists
+        # and fails with 42P10 when it doesn't
+        sample = supabase_service.client.table("users").select("*").limit(1).execute()
+        if sample.data:
+            supabase_service.client.table("users")\
+                .upsert(sample.data[0], on_conflict="email", ignore_duplicates=True)\
+                .execute()
+            print("✅ users.email has a unique index")
+        else:
+            print("⚠️  users table has no rows, can't check the email index")
+    except Exception as e:
+        print(f"❌ users.email unique index missing: {e}")
+        print("Signups use check-then-insert until you run migrations/add_users_email_unique.sql:")
+        print((Path(__file__).parent / 'migrations' / 'add_users_email_unique.sql').read_text())
+    
+    print("\n🔍 Checking api_keys.key_lookup_hash column...")
+    
+    try:
+        supabase_service.client.table("api_keys").select("id,key_lookup_hash").limit(1).execute()
+        print("✅ api_keys.key_lookup_hash exists")
+    except Exception as e:
+        print(f"❌ api_keys.key_lookup_hash missing: {e}")
+        print("API keys are verified by prefix until you run migrations/add_api_key_lookup_hash.sql:")
+        print((Path(__file__).parent / 'migrations' / 'add_api_key_lookup_hash.sql').read_text())
+
+    print("\n🔍 Checking increment_api_key_usage function...")
+    
+    try:
+        # Zero delta against an id that cannot exist: resolves the function without touching any row
+        supabase_service.client.rpc("increment_api_key_usage", {
+            "p_id": "00000000-0000-0000-0000-000000000000",
+            "p_delta": 0,
+            "p_last_used": "1970-01-01T00:00:00"
+        }).execute()
+        print("✅ increment_api_key_usage exists")
+    except Exception as e:
+        print(f"❌ increment_api_key_usage missing: {e}")
+        print("API key usage is flushed with read-modify-write until you run migrations/add_increment_api_key_usage.sql:")
+        print((Path(__file__).parent / 'migrations' / 'add_increment_api_key_usage.sql').read_text())
+
 except Exception as e:
     print(f"❌ Error: {e}")
     print("Make sure you have the backend dependencies installed and environment variables set.")
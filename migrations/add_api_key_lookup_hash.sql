@@ -0,0 +1,12 @@
+-- Deterministic HMAC of each raw API key (see utils.security_utils.compute_api_key_lookup_hash),
+-- so verify_api_key can find a key with one indexed equality lookup.
+-- Existing keys keep a NULL hash and are backfilled the first time they are used.
+
+ALTER TABLE api_keys ADD COLUMN IF NOT EXISTS key_lookup_hash VARCHAR(64);
+
+CREATE UNIQUE INDEX IF NOT EXISTS idx_api_keys_key_lookup_hash
+    ON api_keys (key_lookup_hash)
+    WHERE key_lookup_hash IS NOT NULL;
+
+-- Make PostgREST pick up the new column without a restart
+NOTIFY pgrst, 'reload schema';
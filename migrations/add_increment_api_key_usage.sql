@@ -0,0 +1,18 @@
+-- Atomic usage increment used by SupabaseService._add_api_key_usage when flushing
+-- buffered API key usage: one statement instead of SELECT then UPDATE, so concurrent
+-- workers cannot lose each other's increments.
+-- Without it the flusher logs a warning and falls back to read-modify-write.
+
+CREATE OR REPLACE FUNCTION increment_api_key_usage(p_id uuid, p_delta integer, p_last_used timestamptz)
+RETURNS integer
+LANGUAGE sql
+AS $$
+    UPDATE api_keys
+    SET usage_count = COALESCE(usage_count, 0) + p_delta,
+        last_used = p_last_used
+    WHERE id = p_id
+    RETURNING usage_count;
+$$;
+
+-- Make PostgREST pick up the new function without a restart
+NOTIFY pgrst, 'reload schema';
@@ -0,0 +1,9 @@
+-- Unique index on users.email. SupabaseService.create_user inserts with
+-- ON CONFLICT (email) DO NOTHING, which needs this index as its conflict target.
+-- Without it the service logs a warning and falls back to check-then-insert.
+-- Fails if duplicate emails already exist; resolve those rows first.
+
+CREATE UNIQUE INDEX IF NOT EXISTS users_email_unique_idx ON users (email);
+
+-- Make PostgREST pick up the new index without a restart
+NOTIFY pgrst, 'reload schema';